@@ -0,0 +1,120 @@
+"""
+checksum.py — CRC-32 helpers shared by the SoundPixel codecs
+=============================================================
+Picks the fastest CRC-32 backend available on this host and checksums very
+large payloads in parallel:
+
+  - Backend selection: pycrc32 (PCLMULQDQ / ARMv8 crc32), then the deflate
+    wheel (libdeflate, VPCLMULQDQ / PMULL), then stdlib zlib.crc32. All of
+    them compute the standard CRC-32 polynomial, so results are identical.
+  - Parallel pass: buffers past PARALLEL_THRESHOLD are split into contiguous
+    memoryview chunks checksummed on a small thread pool (zlib.crc32 and the
+    optional backends release the GIL), then folded together with the GF(2)
+    combine trick zlib uses for crc32_combine.
+"""
+
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from pycrc32 import crc32 as _backend_crc32
+except ImportError:
+    try:
+        from deflate import crc32 as _backend_crc32
+    except ImportError:
+        _backend_crc32 = zlib.crc32
+
+
+# Below this size the buffer is checksummed on the calling thread; thread
+# dispatch only pays off once the payload dwarfs the pool overhead.
+PARALLEL_THRESHOLD = 8 * 1024 * 1024
+
+_MAX_WORKERS = min(4, os.cpu_count() or 1)
+_POOL = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        _POOL = ThreadPoolExecutor(max_workers=_MAX_WORKERS)
+    return _POOL
+
+
+# ── CRC-32 combine (GF(2) matrix trick, as in zlib's crc32_combine) ───────────
+
+_CRC_POLY = 0xEDB88320  # CRC-32, reflected
+
+
+def _gf2_matrix_times(mat: list[int], vec: int) -> int:
+    total = 0
+    i = 0
+    while vec:
+        if vec & 1:
+            total ^= mat[i]
+        vec >>= 1
+        i += 1
+    return total
+
+
+def _gf2_matrix_square(mat: list[int]) -> list[int]:
+    return [_gf2_matrix_times(mat, mat[n]) for n in range(32)]
+
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    """CRC-32 of A+B given crc(A), crc(B) and len(B), in O(log len2)."""
+    if len2 <= 0:
+        return crc1 & 0xFFFFFFFF
+
+    # Operator for one zero bit, then square up to the length of B
+    odd = [_CRC_POLY]
+    row = 1
+    for _ in range(31):
+        odd.append(row)
+        row <<= 1
+    even = _gf2_matrix_square(odd)   # two zero bits
+    odd  = _gf2_matrix_square(even)  # four zero bits
+
+    while True:
+        even = _gf2_matrix_square(odd)
+        if len2 & 1:
+            crc1 = _gf2_matrix_times(even, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+        odd = _gf2_matrix_square(even)
+        if len2 & 1:
+            crc1 = _gf2_matrix_times(odd, crc1)
+        len2 >>= 1
+        if not len2:
+            break
+
+    return (crc1 ^ crc2) & 0xFFFFFFFF
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def crc32(data) -> int:
+    """CRC-32 of data via the fastest route available on this host.
+
+    Small buffers go straight to the selected backend; large ones are split
+    across the thread pool and the partial CRCs are combined.
+    """
+    n = len(data)
+    if n < PARALLEL_THRESHOLD or _MAX_WORKERS < 2:
+        return _backend_crc32(data) & 0xFFFFFFFF
+
+    mv = memoryview(data)
+    chunk = (n + _MAX_WORKERS - 1) // _MAX_WORKERS
+    futures = [
+        _pool().submit(_backend_crc32, mv[start : start + chunk])
+        for start in range(0, n, chunk)
+    ]
+
+    crc = 0
+    pos = 0
+    for future in futures:
+        part_len = min(chunk, n - pos)
+        crc = crc32_combine(crc, future.result() & 0xFFFFFFFF, part_len)
+        pos += part_len
+    return crc
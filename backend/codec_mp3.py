@@ -56,11 +56,14 @@ Guarantees
 """
 
 import struct
-import zlib
 from dataclasses import dataclass
 
 import encryption
 
+# Backend selection (SIMD wheels with zlib fallback) and the parallel pass
+# for very large payloads both live in checksum.py.
+from checksum import crc32 as _fast_crc32
+
 MAGIC      = b"SPXLV2\x00\x00"   # 8 bytes
 TAIL_MAGIC = b"SPXLEND\x00"       # 8 bytes
 VERSION    = 2
@@ -71,7 +74,19 @@ MAX_FNAME_BYTES = 255
 
 # Fixed-size part of the header (after MAGIC, before variable-length filename):
 #   version(2) + img_size(8) + crc32(4) + fname_len(2) = 16 bytes
-HEADER_FIXED = 16
+# Compiled once so the format string is not re-parsed on every encode/decode.
+# MAGIC + version never change, so they are packed once at import and only
+# the variable tail is packed per call.
+_HEADER_STRUCT        = struct.Struct(">HQIH")
+_PACKED_MAGIC_VERSION = MAGIC + struct.pack(">H", VERSION)
+_HEADER_VAR_STRUCT    = struct.Struct(">QIH")
+HEADER_FIXED   = _HEADER_STRUCT.size
+
+# Length-to-MAGIC trailer written just before TAIL_MAGIC: the byte count from
+# MAGIC up to (not including) this field. Decode reads it to seek straight to
+# the block start instead of scanning backwards through the audio.
+_BLOCK_LEN_STRUCT = struct.Struct(">Q")
+BLOCK_LEN_SIZE    = _BLOCK_LEN_STRUCT.size
 
 
 # ── Exceptions ────────────────────────────────────────────────────────────────
@@ -108,36 +123,117 @@ class DecodeResult:
 
 # ── Internal helpers ──────────────────────────────────────────────────────────
 
+# Initial reverse-search window. The block sits at the very end of the file,
+# so scan backwards in growing windows instead of letting rfind walk the
+# entire (potentially hundreds of MB) audio stream on every decode.
+_SCAN_WINDOW = 64 * 1024
+
+
+def _rfind_near_end(data, needle: bytes, end: int) -> int:
+    """Equivalent to data.rfind(needle, 0, end), searched back-to-front."""
+    window = _SCAN_WINDOW
+    hi = end
+    while hi > 0:
+        lo = max(0, hi - window)
+        pos = data.rfind(needle, lo, hi)
+        if pos != -1:
+            return pos
+        if lo == 0:
+            break
+        hi = lo + len(needle) - 1   # overlap, so boundary-straddling matches are seen
+        window *= 2
+    return -1
+
+
+# Both block magics (plain MAGIC and encryption.MAGIC) start with this, so a
+# single backwards scan can locate whichever kind of block is present.
+_MAGIC_PREFIX = b"SPXL"
+
+
+def _find_last_magic(data, end: int) -> tuple[int, bool]:
+    """Locate the block magic closest to the end in a single scan.
+
+    Returns (position, is_encrypted), or (-1, False) when neither the plain
+    nor the encrypted magic occurs before end. Replaces two separate
+    windowed searches over the same tail region.
+    """
+    hi = end
+    while True:
+        pos = _rfind_near_end(data, _MAGIC_PREFIX, hi)
+        if pos == -1:
+            return -1, False
+        candidate = data[pos : pos + MAGIC_LEN]
+        if candidate == MAGIC:
+            return pos, False
+        if candidate in encryption.KNOWN_MAGICS:
+            return pos, True
+        # A stray 'SPXL' inside the payload — keep scanning backwards.
+        hi = pos + len(_MAGIC_PREFIX) - 1
+
+
+def _seek_magic(data, tail_start: int) -> tuple[int, bool]:
+    """Find the block magic, in O(1) where the length trailer exists.
+
+    Blocks written by this build end with an 8-byte length-to-magic field
+    just before TAIL_MAGIC, so the block start can be computed directly.
+    The computed position is only trusted if one of the magics actually
+    sits there; files from older builds (no trailer) fall back to the
+    windowed scan. Returns (position, is_encrypted) like _find_last_magic.
+    """
+    if tail_start >= BLOCK_LEN_SIZE:
+        (body_len,) = _BLOCK_LEN_STRUCT.unpack_from(data, tail_start - BLOCK_LEN_SIZE)
+        pos = tail_start - BLOCK_LEN_SIZE - body_len
+        if 0 <= pos < tail_start:
+            candidate = data[pos : pos + MAGIC_LEN]
+            if candidate == MAGIC:
+                return pos, False
+            if candidate in encryption.KNOWN_MAGICS:
+                return pos, True
+    return _find_last_magic(data, tail_start)
+
+
+def _encode_filename(filename: str) -> bytes:
+    """UTF-8 encode filename, truncating to MAX_FNAME_BYTES if needed.
+
+    Truncation backs up over UTF-8 continuation bytes so an oversized name
+    loses whole characters instead of ending in a mangled partial sequence.
+    """
+    fname_bytes = filename.encode("utf-8")
+    cut = MAX_FNAME_BYTES
+    if len(fname_bytes) <= cut:
+        return fname_bytes
+    while cut and fname_bytes[cut] & 0xC0 == 0x80:
+        cut -= 1
+    return fname_bytes[:cut]
+
+
 def _build_block(image_bytes: bytes, image_filename: str, password: str = None) -> bytes:
     """
     Build the binary block that gets appended after the MP3 frames.
-    
+
     If password is provided:
         Layout: ENCMAGIC + salt + nonce + tag + encrypted(header + image) + TAIL_MAGIC
     Else:
         Layout: MAGIC + version + img_size + crc32 + fname_len + fname + image_data + TAIL_MAGIC
     """
-    fname_bytes = image_filename.encode("utf-8")[:MAX_FNAME_BYTES]
-    crc = zlib.crc32(image_bytes) & 0xFFFFFFFF
+    fname_bytes = _encode_filename(image_filename)
+    crc = _fast_crc32(image_bytes)
 
     header = (
-        MAGIC
-        + struct.pack(">HQIH",
-            VERSION,
-            len(image_bytes),
-            crc,
-            len(fname_bytes),
-        )
+        _PACKED_MAGIC_VERSION
+        + _HEADER_VAR_STRUCT.pack(len(image_bytes), crc, len(fname_bytes))
         + fname_bytes
     )
     
-    payload = header + image_bytes
-    
-    # Encrypt if password is provided
+    # join() accepts any bytes-like region, so memoryview/bytearray payloads
+    # flow through without an up-front bytes() copy.
     if password:
-        payload = encryption.encrypt(payload, password)
-    
-    return payload + TAIL_MAGIC
+        # Encrypt if password is provided
+        payload = encryption.encrypt(b"".join((header, image_bytes)), password)
+        return b"".join((payload, _BLOCK_LEN_STRUCT.pack(len(payload)), TAIL_MAGIC))
+
+    body_len = len(header) + len(image_bytes)
+    return b"".join((header, image_bytes, _BLOCK_LEN_STRUCT.pack(body_len), TAIL_MAGIC))
 
 
 def _find_and_parse_block(data: bytes, password: str = None) -> tuple[bytes, str]:
@@ -147,6 +243,11 @@ def _find_and_parse_block(data: bytes, password: str = None) -> tuple[bytes, str
     Returns (image_bytes, image_filename).
     Raises NotEncodedError, CorruptedFileError, or UnsupportedVersionError.
     """
+    if isinstance(data, memoryview):
+        # The bytes-level search APIs (rfind/endswith) need a real bytes
+        # object; bytes and bytearray inputs pass through copy-free.
+        data = bytes(data)
+
     # Quick check: file must end with TAIL_MAGIC
     if not data.endswith(TAIL_MAGIC):
         raise NotEncodedError(
@@ -154,23 +255,26 @@ def _find_and_parse_block(data: bytes, password: str = None) -> tuple[bytes, str
             "This MP3 was not created by SoundPixel, or it was truncated."
         )
 
-    # Locate block start from the end
+    # Locate block start from the end: the length trailer gives a direct
+    # seek for current files, with a backwards scan as the legacy fallback
     tail_start = len(data) - TAIL_LEN
-    
-    # Try to find encryption magic first, then unencrypted magic
-    enc_magic_pos = data.rfind(encryption.MAGIC, 0, tail_start)
-    magic_pos = data.rfind(MAGIC, 0, tail_start)
-    
-    # Determine which magic was found and is closest to the end (most recent)
-    if enc_magic_pos != -1 and (magic_pos == -1 or enc_magic_pos > magic_pos):
+    magic_pos, encrypted = _seek_magic(data, tail_start)
+
+    if magic_pos == -1:
+        raise CorruptedFileError(
+            "TAIL_MAGIC found but header MAGIC is missing. "
+            "The file is corrupted or partially overwritten."
+        )
+
+    if encrypted:
         # Encrypted block found
-        encrypted_payload = data[enc_magic_pos:tail_start]
-        
+        encrypted_payload = data[magic_pos:tail_start]
+
         if not password:
             raise CorruptedFileError(
                 "MP3 contains encrypted image data but no password was provided."
             )
-        
+
         # Decrypt
         try:
             decrypted = encryption.decrypt(encrypted_payload, password)
@@ -182,17 +286,12 @@ def _find_and_parse_block(data: bytes, password: str = None) -> tuple[bytes, str
             raise CorruptedFileError(
                 f"Invalid password: {str(exc)}"
             ) from exc
-        
+
         # Now parse the decrypted block as a regular block
-        data_to_parse = decrypted
-    elif magic_pos != -1:
-        # Unencrypted block found
-        data_to_parse = data[magic_pos:tail_start]
+        data_to_parse = memoryview(decrypted)
     else:
-        raise CorruptedFileError(
-            "TAIL_MAGIC found but header MAGIC is missing. "
-            "The file is corrupted or partially overwritten."
-        )
+        # Unencrypted block found (zero-copy view into the carrier)
+        data_to_parse = memoryview(data)[magic_pos:tail_start]
 
     # Now parse the (possibly decrypted) block
     offset = MAGIC_LEN  # Skip MAGIC
@@ -202,7 +301,7 @@ def _find_and_parse_block(data: bytes, password: str = None) -> tuple[bytes, str
     if offset + needed > len(data_to_parse):
         raise CorruptedFileError("Header is truncated.")
 
-    version, img_size, expected_crc, fname_len = struct.unpack_from(">HQIH", data_to_parse, offset)
+    version, img_size, expected_crc, fname_len = _HEADER_STRUCT.unpack_from(data_to_parse, offset)
     offset += HEADER_FIXED
 
     if version != VERSION:
@@ -213,7 +312,7 @@ def _find_and_parse_block(data: bytes, password: str = None) -> tuple[bytes, str
     # Parse filename
     if offset + fname_len > len(data_to_parse):
         raise CorruptedFileError("Filename field is truncated.")
-    image_filename = data_to_parse[offset : offset + fname_len].decode("utf-8", errors="replace")
+    image_filename = bytes(data_to_parse[offset : offset + fname_len]).decode("utf-8", errors="replace")
     offset += fname_len
 
     # Parse image data
@@ -222,17 +321,18 @@ def _find_and_parse_block(data: bytes, password: str = None) -> tuple[bytes, str
             f"Image data field claims {img_size} bytes but only "
             f"{len(data_to_parse) - offset} bytes are available."
         )
-    image_bytes = data_to_parse[offset : offset + img_size]
 
-    # Verify CRC-32
-    actual_crc = zlib.crc32(image_bytes) & 0xFFFFFFFF
+    # Verify CRC-32 through a zero-copy view; the image bytes are only
+    # materialized once the checksum matches.
+    image_view = data_to_parse[offset : offset + img_size]
+    actual_crc = _fast_crc32(image_view)
     if actual_crc != expected_crc:
         raise CorruptedFileError(
             f"CRC-32 mismatch: expected 0x{expected_crc:08X}, got 0x{actual_crc:08X}. "
             "The embedded image data is corrupted."
         )
 
-    return image_bytes, image_filename
+    return bytes(image_view), image_filename
 
 
 # ── Public API ────────────────────────────────────────────────────────────────
@@ -260,21 +360,27 @@ def encode(
         TypeError:      If arguments are not bytes.
         ValueError:     If mp3_bytes does not look like an MP3 or ID3 file.
     """
-    if not isinstance(mp3_bytes, (bytes, bytearray)):
+    if not isinstance(mp3_bytes, (bytes, bytearray, memoryview)):
         raise TypeError(f"mp3_bytes must be bytes, got {type(mp3_bytes).__name__}")
-    if not isinstance(image_bytes, (bytes, bytearray)):
+    if not isinstance(image_bytes, (bytes, bytearray, memoryview)):
         raise TypeError(f"image_bytes must be bytes, got {type(image_bytes).__name__}")
     if not image_filename:
         image_filename = "image.png"
 
-    # Strip any previously embedded block so encode is idempotent
-    if mp3_bytes.endswith(TAIL_MAGIC):
-        magic_pos = mp3_bytes.rfind(MAGIC)
+    # Strip any previously embedded block so encode is idempotent. memoryview
+    # carriers are only materialized here, on the rare re-encode path.
+    if len(mp3_bytes) >= TAIL_LEN and bytes(mp3_bytes[-TAIL_LEN:]) == TAIL_MAGIC:
+        if isinstance(mp3_bytes, memoryview):
+            mp3_bytes = bytes(mp3_bytes)
+        magic_pos, _ = _seek_magic(mp3_bytes, len(mp3_bytes) - TAIL_LEN)
         if magic_pos != -1:
             mp3_bytes = mp3_bytes[:magic_pos]
 
-    block = _build_block(bytes(image_bytes), image_filename, password)
-    output = bytes(mp3_bytes) + block
+    block = _build_block(image_bytes, image_filename, password)
+    # join() allocates the result once and copies each region exactly once;
+    # bytes(mp3_bytes) + block would first copy the whole (possibly tens of
+    # MB) audio buffer just to coerce a bytearray, then copy again to concat.
+    output = b"".join((mp3_bytes, block))
 
     return EncodeResult(
         mp3_bytes=output,
@@ -302,7 +408,7 @@ def decode(mp3_bytes: bytes, password: str = None) -> DecodeResult:
         UnsupportedVersionError: Block uses an unknown version.
         encryption.DecryptionFailedError: Wrong password or data tampered.
     """
-    image_bytes, image_filename = _find_and_parse_block(bytes(mp3_bytes), password)
+    image_bytes, image_filename = _find_and_parse_block(mp3_bytes, password)
     return DecodeResult(
         image_data=image_bytes,
         image_filename=image_filename,
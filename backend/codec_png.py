@@ -47,7 +47,6 @@ GUARANTEE
     - Tampered/corrupted data detected immediately
 """
 import io
-import math
 import struct
 import zlib
 from dataclasses import dataclass
@@ -56,15 +55,45 @@ from PIL import Image
 
 import encryption
 
+# Backend selection (SIMD wheels with zlib fallback) and the parallel pass
+# for very large payloads both live in checksum.py.
+from checksum import crc32 as _fast_crc32
+
+# Optional: fpng (SSE4.1-accelerated PNG encoder, ~10-20x libpng at similar
+# ratios). Used for compressible payloads when the wheel is present; the
+# Pillow path below remains the fallback.
+try:
+    import fpng_py as _fpng
+    if not _fpng.fpng_cpu_supports_sse41():
+        _fpng = None
+except (ImportError, AttributeError):
+    _fpng = None
+
+# Optional: libdeflate for the store-only writer's zlib framing — 2-4x
+# faster than system zlib even at level 0, where the cost is the Adler-32
+# pass and the block copies. Probed once at import; any failure (missing
+# wheel, level-0 unsupported) falls back to stdlib zlib.
+try:
+    import deflate as _libdeflate
+    _libdeflate.zlib_compress(b"\x00", 0)
+except Exception:
+    _libdeflate = None
+
 
 # ── Constants ─────────────────────────────────────────────────────────────────
 
 MAGIC   = b"SPXL"
 VERSION = 1
 
-# Fixed prefix size: magic(4) + version(4) + data_len(8) + crc32(4) + fname_len(2) = 22 bytes
-HEADER_PREFIX = 22
-MAX_FNAME_LEN = 255
+# Fixed prefix: magic(4) + version(4) + data_len(8) + crc32(4) + fname_len(2) = 22 bytes
+# Compiled once so the format string is not re-parsed on every encode/decode.
+# The magic + version bytes never change, so they are packed once at import
+# and only the variable tail is packed per call.
+_HEADER_STRUCT        = struct.Struct(">4sIQIH")
+_PACKED_MAGIC_VERSION = struct.pack(">4sI", MAGIC, VERSION)
+_HEADER_VAR_STRUCT    = struct.Struct(">QIH")
+HEADER_PREFIX  = _HEADER_STRUCT.size
+MAX_FNAME_LEN  = 255
 
 
 # ── Exceptions ────────────────────────────────────────────────────────────────
@@ -100,22 +129,31 @@ class PngDecodeResult:
 
 # ── Internal helpers ──────────────────────────────────────────────────────────
 
+def _encode_filename(filename: str) -> bytes:
+    """UTF-8 encode filename, truncating to MAX_FNAME_LEN if needed.
+
+    Truncation backs up over UTF-8 continuation bytes so an oversized name
+    loses whole characters instead of ending in a mangled partial sequence.
+    """
+    fname_bytes = filename.encode("utf-8")
+    cut = MAX_FNAME_LEN
+    if len(fname_bytes) <= cut:
+        return fname_bytes
+    while cut and fname_bytes[cut] & 0xC0 == 0x80:
+        cut -= 1
+    return fname_bytes[:cut]
+
+
 def _build_header(data: bytes, filename: str) -> bytes:
     """Pack the binary header that precedes the payload bytes."""
-    fname_bytes = filename.encode("utf-8")[:MAX_FNAME_LEN]
-    crc         = zlib.crc32(data) & 0xFFFFFFFF
-
-    header = struct.pack(
-        ">4sIQIH",
-        MAGIC,
-        VERSION,
-        len(data),
-        crc,
-        len(fname_bytes),
-    ) + fname_bytes
+    fname_bytes = _encode_filename(filename)
+    crc         = _fast_crc32(data)
 
-    assert len(header) == HEADER_PREFIX + len(fname_bytes)
-    return header
+    return (
+        _PACKED_MAGIC_VERSION
+        + _HEADER_VAR_STRUCT.pack(len(data), crc, len(fname_bytes))
+        + fname_bytes
+    )
 
 
 def _parse_header(stream: bytes) -> tuple[int, int, int, str, int]:
@@ -128,7 +166,7 @@ def _parse_header(stream: bytes) -> tuple[int, int, int, str, int]:
     if len(stream) < HEADER_PREFIX:
         raise NotAPngCodecFile("Stream too short to contain a SoundPixel header.")
 
-    magic, version, data_len, crc32, fname_len = struct.unpack_from(">4sIQIH", stream, 0)
+    magic, version, data_len, crc32, fname_len = _HEADER_STRUCT.unpack_from(stream, 0)
 
     if magic != MAGIC:
         raise NotAPngCodecFile(
@@ -149,11 +187,90 @@ def _parse_header(stream: bytes) -> tuple[int, int, int, str, int]:
     return version, data_len, crc32, filename, header_total
 
 
-def _square_dimensions(num_pixels: int) -> tuple[int, int]:
-    """Return (width, height) for the smallest near-square image that fits num_pixels."""
-    width  = math.ceil(math.sqrt(num_pixels))
-    height = math.ceil(num_pixels / width)
-    return width, height
+def _image_to_bytes(img: Image.Image) -> bytes:
+    """Flat R,G,B,R,G,B,… byte stream of img in one single-shot allocation.
+
+    Image.tobytes() pulls the pixels in 64 KB chunks and joins them, which
+    costs ~2x peak memory and an extra copy on large canvases. Ask Pillow's
+    raw encoder for the whole buffer at once instead; fall back to tobytes()
+    if the private encoder API ever changes.
+    """
+    img.load()
+    try:
+        encoder = Image._getencoder(img.mode, "raw", img.mode)
+        encoder.setimage(img.im, (0, 0) + img.size)
+        _, errcode, data = encoder.encode(img.width * img.height * len(img.mode))
+        if errcode == 1:  # 1 = encoder finished in this single pass
+            return data
+    except (AttributeError, TypeError, OSError):
+        pass
+    return img.tobytes()
+
+
+# PNG container pieces for the store-only writer below
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_IHDR_STRUCT   = struct.Struct(">IIBBBBB")  # width, height, depth, color, comp, filter, interlace
+_LEN_STRUCT    = struct.Struct(">I")
+
+
+def _png_chunk(tag: bytes, body: bytes) -> bytes:
+    """Frame body as a PNG chunk: length + tag + body + CRC-32 over tag+body."""
+    crc = zlib.crc32(body, zlib.crc32(tag)) & 0xFFFFFFFF
+    return b"".join((_LEN_STRUCT.pack(len(body)), tag, body, _LEN_STRUCT.pack(crc)))
+
+
+def _write_store_png(canvas, width: int, height: int) -> bytes:
+    """Wrap raw RGB pixels in a PNG container without compressing them.
+
+    Builds the filtered stream by hand (filter byte 0 before each scanline)
+    and frames it with zlib level 0, which emits stored DEFLATE blocks plus
+    the Adler-32 trailer at memcpy speed. Skips Pillow entirely: no
+    Image.frombytes copy, no per-row filter heuristics, no Deflate search —
+    the right container for payloads that do not compress anyway.
+    """
+    row      = width * 3
+    src      = memoryview(canvas)
+    filtered = bytearray(height * (row + 1))
+    pos = 0
+    for y in range(height):
+        filtered[pos + 1 : pos + 1 + row] = src[y * row : (y + 1) * row]
+        pos += row + 1
+
+    ihdr = _IHDR_STRUCT.pack(width, height, 8, 2, 0, 0, 0)  # 8-bit RGB, no interlace
+    if _libdeflate is not None:                             # stored blocks + Adler-32
+        idat = _libdeflate.zlib_compress(bytes(filtered), 0)
+    else:
+        idat = zlib.compress(bytes(filtered), 0)
+
+    return b"".join((
+        _PNG_SIGNATURE,
+        _png_chunk(b"IHDR", ihdr),
+        _png_chunk(b"IDAT", idat),
+        _png_chunk(b"IEND", b""),
+    ))
+
+
+def _looks_incompressible(data) -> bool:
+    """Heuristic: deflate gains (almost) nothing on the first KB of data."""
+    sample = bytes(data[:1024])
+    if len(sample) < 256:
+        return False
+    return len(zlib.compress(sample, 1)) >= len(sample) * 95 // 100
+
+
+# Canvas row width in pixels. A fixed width means the canvas wastes at most
+# one partial row (the near-square layout padded up to a full extra column —
+# ~2*sqrt(n) pixels), keeps scanlines at a cache-friendly 12 KB, and makes
+# the row loop in the store-only writer independent of payload size.
+_ROW_PIXELS = 4096
+
+
+def _plan_dimensions(num_pixels: int) -> tuple[int, int]:
+    """Return (width, height) for the canvas that fits num_pixels."""
+    if num_pixels <= _ROW_PIXELS:
+        return max(num_pixels, 1), 1
+    height = (num_pixels + _ROW_PIXELS - 1) // _ROW_PIXELS
+    return _ROW_PIXELS, height
 
 
 # ── Public API ────────────────────────────────────────────────────────────────
@@ -171,35 +288,63 @@ def encode(data: bytes, filename: str = "audio.mp3", password: str = None) -> Pn
     Returns:
         PngEncodeResult with the PNG bytes and metadata.
     """
-    if not isinstance(data, (bytes, bytearray)):
+    if not isinstance(data, (bytes, bytearray, memoryview)):
         raise TypeError(f"data must be bytes, got {type(data).__name__}")
 
     filename = filename or "file.bin"
-    header   = _build_header(bytes(data), filename)
-    payload  = header + bytes(data)
-    
-    # Encrypt payload if password provided
-    if password:
-        payload = encryption.encrypt(payload, password)
-
-    # Pad to a multiple of 3 so every pixel is fully populated
-    remainder = len(payload) % 3
-    if remainder:
-        payload += bytes(3 - remainder)
 
-    num_pixels = len(payload) // 3
-    width, height = _square_dimensions(num_pixels)
-    total_pixels  = width * height
-
-    # Pad to fill the rectangular canvas
-    payload += bytes((total_pixels - num_pixels) * 3)
-
-    img = Image.frombytes("RGB", (width, height), payload)
-    buf = io.BytesIO()
-    img.save(buf, format="PNG", compress_level=1, optimize=False)
+    if password:
+        # Encryption needs the contiguous header + data plaintext; the
+        # ciphertext is then laid out on the canvas like any other payload.
+        # join() copies each region exactly once, without first coercing a
+        # bytearray/memoryview input to bytes (a full extra copy at 200 MB).
+        header      = _build_header(data, filename)
+        payload     = encryption.encrypt(b"".join((header, data)), password)
+        payload_len = len(payload)
+        fname_bytes = None
+    else:
+        fname_bytes = _encode_filename(filename)
+        payload     = None
+        payload_len = HEADER_PREFIX + len(fname_bytes) + len(data)
+
+    num_pixels    = (payload_len + 2) // 3   # pad to whole pixels
+    width, height = _plan_dimensions(num_pixels)
+
+    # Single zero-initialized allocation of the final canvas size: both the
+    # whole-pixel pad and the rectangular-canvas pad come for free, and the
+    # plain path packs the header straight into the canvas so no intermediate
+    # header/payload bytes objects are built at all.
+    canvas = bytearray(width * height * 3)
+    if password:
+        canvas[:payload_len] = payload
+    else:
+        crc = _fast_crc32(data)
+        canvas[: len(_PACKED_MAGIC_VERSION)] = _PACKED_MAGIC_VERSION
+        _HEADER_VAR_STRUCT.pack_into(
+            canvas, len(_PACKED_MAGIC_VERSION), len(data), crc, len(fname_bytes)
+        )
+        header_len = HEADER_PREFIX + len(fname_bytes)
+        canvas[HEADER_PREFIX:header_len] = fname_bytes
+        canvas[header_len:payload_len]   = data
+
+    # Deflate is the dominant CPU cost of encode, and typical inputs (MP3,
+    # JPEG) as well as ciphertext are already compressed — those go through
+    # the store-only writer instead of paying for a search that saves ~0%.
+    if password or _looks_incompressible(data):
+        png_bytes = _write_store_png(canvas, width, height)
+    elif _fpng is not None:
+        png_bytes = _fpng.fpng_encode_image_to_memory(bytes(canvas), width, height, 3)
+    else:
+        # frombuffer references the canvas directly where the mode allows it,
+        # instead of frombytes' unconditional copy-in; the canvas stays in
+        # scope (and thus alive) until save() has consumed it.
+        img = Image.frombuffer("RGB", (width, height), canvas, "raw", "RGB", 0, 1)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", compress_level=1, optimize=False)
+        png_bytes = buf.getvalue()
 
     return PngEncodeResult(
-        png_bytes=buf.getvalue(),
+        png_bytes=png_bytes,
         image_width=width,
         image_height=height,
         input_size=len(data),
@@ -225,11 +370,16 @@ def decode(png_bytes: bytes, password: str = None) -> PngDecodeResult:
         encryption.DecryptionFailedError: Wrong password or data tampered.
     """
     try:
-        img = Image.open(io.BytesIO(png_bytes)).convert("RGB")
+        img = Image.open(io.BytesIO(png_bytes))
+        # PNGs we wrote are already plain RGB; convert() on those is a full
+        # extra allocate-and-copy pass, so only pay for it on foreign inputs
+        # (palette, alpha, grayscale).
+        if img.mode != "RGB":
+            img = img.convert("RGB")
     except Exception as exc:
         raise NotAPngCodecFile(f"Could not open as PNG: {exc}") from exc
 
-    stream = img.tobytes()  # flat R,G,B,R,G,B,… byte sequence
+    stream = _image_to_bytes(img)  # flat R,G,B,R,G,B,… byte sequence
     
     # Check if payload is encrypted
     if encryption.is_encrypted(stream):
@@ -259,13 +409,14 @@ def decode(png_bytes: bytes, password: str = None) -> PngDecodeResult:
             f"{len(stream) - data_start} bytes remain after the header."
         )
 
-    data = stream[data_start:data_end]
-
-    actual_crc = zlib.crc32(data) & 0xFFFFFFFF
+    # Checksum through a zero-copy view so verification is a single pass over
+    # the pixel buffer; the payload is only materialized once, for the result.
+    data_view  = memoryview(stream)[data_start:data_end]
+    actual_crc = _fast_crc32(data_view)
     if actual_crc != expected_crc:
         raise PngCorruptedError(
             f"CRC-32 mismatch (expected 0x{expected_crc:08X}, got 0x{actual_crc:08X}). "
             "The PNG may have been re-saved as JPEG or otherwise modified."
         )
 
-    return PngDecodeResult(data=data, filename=filename, data_size=data_len)
\ No newline at end of file
+    return PngDecodeResult(data=bytes(data_view), filename=filename, data_size=data_len)
\ No newline at end of file
@@ -8,12 +8,17 @@ Provides password-based authenticated encryption using:
   - 128-bit authentication tag
 
 Format Layout (for encrypted payloads):
-  Bytes  0–7    Magic:       b'SPXLENC\x00'  (marks as encrypted)
-  Bytes  8–15   Salt:        16 bytes (PBKDF2 salt)
-  Bytes  16–31  Nonce:       16 bytes (AES-GCM nonce)
-  Bytes  32–47  Auth Tag:    16 bytes (authentication tag)
-  Bytes  48–55  Ciphertext len: 8 bytes (uint64 big-endian, for proper extraction)
-  Bytes  56+    Ciphertext:  encrypted data (AES-256-GCM)
+  Bytes  0–7    Magic:       b'SPXLENC\x02'  (marks as encrypted)
+  Bytes  8–23   Salt:        16 bytes (PBKDF2 salt)
+  Bytes  24–35  Nonce:       12 bytes (AES-GCM nonce, NIST-canonical 96 bits)
+  Bytes  36–51  Auth Tag:    16 bytes (authentication tag)
+  Bytes  52–55  Iterations:  4 bytes (uint32 big-endian, PBKDF2 iteration count)
+  Bytes  56–63  Ciphertext len: 8 bytes (uint64 big-endian, for proper extraction)
+  Bytes  64+    Ciphertext:  encrypted data (AES-256-GCM)
+
+Legacy blocks still decrypt: b'SPXLENC\x01' (no iteration field, 96-bit
+nonce) and b'SPXLENC\x00' (no iteration field, 128-bit nonce) both imply
+the historical fixed count of 100 000 iterations.
 
 Key Derivation:
   PBKDF2-SHA256(password, salt, iterations=100000)  →  256-bit key
@@ -25,29 +30,63 @@ Guarantees:
   - Password strength: Use at least 12 characters for security
 """
 
+import functools
+import hashlib
 import os
 import struct
 import zlib
 from typing import Tuple
 
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf import pbkdf2
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+# update_into needs the output buffer to be one AES block minus one byte
+# larger than the input, even though GCM writes exactly len(input) bytes.
+_UPDATE_INTO_SLACK = 15
 
 
 # ── Constants ─────────────────────────────────────────────────────────────────
 
-MAGIC            = b"SPXLENC\x00"      # 8 bytes, marks encrypted block
+MAGIC            = b"SPXLENC\x02"      # 8 bytes, marks encrypted block (iterations in header)
+MAGIC_V1         = b"SPXLENC\x01"      # 96-bit nonce, fixed iteration count (read-only)
+MAGIC_V0         = b"SPXLENC\x00"      # 128-bit nonce, fixed iteration count (read-only)
 MAGIC_LEN        = len(MAGIC)           # 8
 SALT_LEN         = 16                   # 16 bytes (128 bits)
-NONCE_LEN        = 16                   # 16 bytes (128 bits, GCM typically uses 96-128 bits)
+NONCE_LEN        = 12                   # 12 bytes (96 bits, GCM's canonical nonce size)
+NONCE_LEN_V0     = 16                   # legacy nonce size for MAGIC_V0 blocks
 TAG_LEN          = 16                   # 16 bytes (128 bits)
+ITER_FIELD       = 4                    # 4 bytes (uint32) PBKDF2 iteration count
 CIPHER_LEN_FIELD = 8                    # 8 bytes (uint64) for ciphertext size
-HEADER_LEN       = MAGIC_LEN + SALT_LEN + NONCE_LEN + TAG_LEN + CIPHER_LEN_FIELD   # 64 bytes total
+HEADER_LEN       = MAGIC_LEN + SALT_LEN + NONCE_LEN + TAG_LEN + ITER_FIELD + CIPHER_LEN_FIELD  # 64 bytes
+HEADER_LEN_V1    = MAGIC_LEN + SALT_LEN + NONCE_LEN + TAG_LEN + CIPHER_LEN_FIELD      # 60 bytes
+HEADER_LEN_V0    = MAGIC_LEN + SALT_LEN + NONCE_LEN_V0 + TAG_LEN + CIPHER_LEN_FIELD   # 64 bytes
+
+# Every magic this build can read, newest first. The codecs scan for these
+# when locating an encrypted block.
+KNOWN_MAGICS     = (MAGIC, MAGIC_V1, MAGIC_V0)
 
-PBKDF2_ITERATIONS = 100000              # NIST recommendation (min 100k)
-PBKDF2_HASH_ALGO  = hashes.SHA256()
+# Compiled once so the format strings are not re-parsed on every call.
+# The header Structs cover the whole fixed header in a single unpack_from
+# (magic, salt, nonce, tag, [iterations,] ciphertext length); the s-fields
+# come back as real bytes objects, which the key cache and modes.GCM both
+# require.
+_ENC_HEADER        = struct.Struct(">8s16s12s16sIQ")  # current, 64 bytes
+_ENC_HEADER_V1     = struct.Struct(">8s16s12s16sQ")   # legacy,  60 bytes
+_ENC_HEADER_V0     = struct.Struct(">8s16s16s16sQ")   # legacy,  64 bytes
+
+# Iteration count for new blocks, tunable per deployment (SHA-NI hosts can
+# afford far more than the 100k floor at the same latency). Decrypt reads
+# the count from the block header, so blocks written under a different
+# setting — or on another host — still open.
+PBKDF2_ITERATIONS  = int(os.environ.get("PBKDF2_ITERATIONS", "100000"))
+_LEGACY_ITERATIONS = 100000             # fixed count used by SPXLENC\x00 and \x01 blocks
+PBKDF2_HASH_ALGO   = "sha256"
+
+# Ceiling for the header-declared iteration count. The header is read before
+# the GCM tag can authenticate anything, so a forged block could otherwise
+# name an arbitrarily large count and burn minutes of CPU per decrypt call.
+# Scales with the deployment's own setting so legitimately-tuned blocks
+# still open.
+MAX_PBKDF2_ITERATIONS = max(PBKDF2_ITERATIONS * 10, 1_000_000)
 
 # ── Exceptions ────────────────────────────────────────────────────────────────
 
@@ -63,58 +102,59 @@ class InvalidPasswordError(EncryptionError):
 
 # ── Public API ────────────────────────────────────────────────────────────────
 
-def encrypt(plaintext: bytes, password: str) -> bytes:
+def encrypt(plaintext: bytes, password: str) -> bytearray:
     """
     Encrypt plaintext with a password using AES-256-GCM.
-    
+
     Args:
         plaintext: The data to encrypt
         password:  Password string (will be UTF-8 encoded)
-    
+
     Returns:
-        bytes: [MAGIC][SALT][NONCE][TAG][CIPHERTEXT_LEN][CIPHERTEXT]
-    
+        bytes-like: [MAGIC][SALT][NONCE][TAG][CIPHERTEXT_LEN][CIPHERTEXT]
+        (a bytearray, so callers can splice it without another copy)
+
     Raises:
         InvalidPasswordError: If password is empty
     """
     if not password or not isinstance(password, str):
         raise InvalidPasswordError("Password must be a non-empty string.")
     
-    # Generate random salt and nonce
-    salt = os.urandom(SALT_LEN)
-    nonce = os.urandom(NONCE_LEN)
-    
-    # Derive key from password
-    key = _derive_key(password, salt)
-    
-    # Encrypt with AES-256-GCM
-    cipher = AESGCM(key)
-    
-    # GCM mode returns (ciphertext + tag), we need to extract tag
-    # Note: cryptography's AESGCM.encrypt returns ciphertext || tag
-    ciphertext_and_tag = cipher.encrypt(nonce, plaintext, None)
-    
-    # Extract authentication tag (last 16 bytes) and ciphertext
-    ciphertext = ciphertext_and_tag[:-TAG_LEN]
-    tag = ciphertext_and_tag[-TAG_LEN:]
-    
-    # Assemble output: MAGIC + SALT + NONCE + TAG + CIPHERTEXT_LEN + CIPHERTEXT
-    output = (MAGIC + salt + nonce + tag + 
-              struct.pack(">Q", len(ciphertext)) + ciphertext)
+    # Generate random salt and nonce in a single getrandom() syscall
+    rnd  = os.urandom(SALT_LEN + NONCE_LEN)
+    salt, nonce = rnd[:SALT_LEN], rnd[SALT_LEN:]
+
+    # Derive key from password (encoded once, passed through as bytes)
+    key = _derive_key(password.encode("utf-8"), salt, PBKDF2_ITERATIONS)
+
+    # Encrypt straight into the output buffer at the ciphertext offset via
+    # the low-level Cipher API: AESGCM.encrypt would return ciphertext||tag
+    # as a fresh allocation that then needs slicing and re-concatenating —
+    # two extra full-size copies at 200 MB payloads.
+    output = bytearray(HEADER_LEN + len(plaintext) + _UPDATE_INTO_SLACK)
+    encryptor = Cipher(algorithms.AES(key), modes.GCM(nonce)).encryptor()
+    written = encryptor.update_into(plaintext, memoryview(output)[HEADER_LEN:])
+    encryptor.finalize()
+    del output[HEADER_LEN + written :]
+
+    # Fill in the header: MAGIC + SALT + NONCE + TAG + ITERATIONS + CIPHERTEXT_LEN
+    _ENC_HEADER.pack_into(
+        output, 0, MAGIC, salt, nonce, encryptor.tag, PBKDF2_ITERATIONS, written
+    )
     return output
 
 
-def decrypt(encrypted_data: bytes, password: str) -> bytes:
+def decrypt(encrypted_data: bytes, password: str) -> bytearray:
     """
     Decrypt data encrypted with encrypt().
-    
+
     Args:
         encrypted_data: Output from encrypt()
         password:       The password used for encryption
-    
+
     Returns:
-        bytes: The original plaintext
-    
+        bytes-like: The original plaintext (a bytearray, written in place)
+
     Raises:
         DecryptionFailedError: If password is wrong or data is tampered
         InvalidPasswordError: If password is invalid
@@ -122,78 +162,102 @@ def decrypt(encrypted_data: bytes, password: str) -> bytes:
     if not password or not isinstance(password, str):
         raise InvalidPasswordError("Password must be a non-empty string.")
     
-    # Check minimum length
-    if len(encrypted_data) < HEADER_LEN:
+    # Check minimum length (HEADER_LEN_V1 is the smallest readable header)
+    if len(encrypted_data) < HEADER_LEN_V1:
         raise DecryptionFailedError(
-            f"Encrypted data too short. Expected at least {HEADER_LEN} bytes."
+            f"Encrypted data too short. Expected at least {HEADER_LEN_V1} bytes."
         )
     
-    # Extract components
-    magic = encrypted_data[:MAGIC_LEN]
-    if magic != MAGIC:
+    # The magic byte picks the header layout; one unpack_from then yields
+    # every fixed field without separate slice allocations. Legacy blocks
+    # carry no iteration field and imply the historical fixed count.
+    magic = bytes(encrypted_data[:MAGIC_LEN])
+    if magic == MAGIC:
+        header_struct = _ENC_HEADER
+    elif magic == MAGIC_V1:
+        header_struct = _ENC_HEADER_V1
+    elif magic == MAGIC_V0:
+        header_struct = _ENC_HEADER_V0
+    else:
         raise DecryptionFailedError(
             f"Invalid magic. Expected {MAGIC!r}, got {magic!r}. "
             "This is not an encrypted SoundPixel block."
         )
-    
-    salt = encrypted_data[MAGIC_LEN:MAGIC_LEN + SALT_LEN]
-    nonce = encrypted_data[MAGIC_LEN + SALT_LEN:MAGIC_LEN + SALT_LEN + NONCE_LEN]
-    tag = encrypted_data[MAGIC_LEN + SALT_LEN + NONCE_LEN:MAGIC_LEN + SALT_LEN + NONCE_LEN + TAG_LEN]
-    
-    # Extract ciphertext length
-    cipher_len_offset = MAGIC_LEN + SALT_LEN + NONCE_LEN + TAG_LEN
-    if len(encrypted_data) < cipher_len_offset + CIPHER_LEN_FIELD:
+
+    if len(encrypted_data) < header_struct.size:
         raise DecryptionFailedError("Ciphertext length field is missing.")
-    
-    cipher_len = struct.unpack(">Q", encrypted_data[cipher_len_offset:cipher_len_offset + CIPHER_LEN_FIELD])[0]
-    
-    # Extract ciphertext
-    ciphertext_start = cipher_len_offset + CIPHER_LEN_FIELD
-    ciphertext = encrypted_data[ciphertext_start:ciphertext_start + cipher_len]
-    
+
+    if header_struct is _ENC_HEADER:
+        _, salt, nonce, tag, iterations, cipher_len = header_struct.unpack_from(encrypted_data)
+        # Bound the unauthenticated count: without this, a forged header is
+        # a pre-auth CPU-burn (uint32 max ≈ 20 minutes of PBKDF2), and a
+        # zero count escapes as a raw ValueError from pbkdf2_hmac.
+        if not 1 <= iterations <= MAX_PBKDF2_ITERATIONS:
+            raise DecryptionFailedError(
+                f"Unreasonable PBKDF2 iteration count {iterations} "
+                f"(accepted range: 1-{MAX_PBKDF2_ITERATIONS})."
+            )
+    else:
+        _, salt, nonce, tag, cipher_len = header_struct.unpack_from(encrypted_data)
+        iterations = _LEGACY_ITERATIONS
+
+    # Extract ciphertext as a zero-copy view
+    ciphertext = memoryview(encrypted_data)[header_struct.size:header_struct.size + cipher_len]
+
     if len(ciphertext) != cipher_len:
         raise DecryptionFailedError(
             f"Ciphertext size mismatch: expected {cipher_len} bytes, got {len(ciphertext)} bytes."
         )
     
-    # Derive key from password and salt
-    key = _derive_key(password, salt)
-    
-    # Decrypt with AES-256-GCM
-    cipher = AESGCM(key)
+    # Derive key from password and salt, at the block's iteration count
+    key = _derive_key(password.encode("utf-8"), salt, iterations)
+
+    # Decrypt with AES-256-GCM via the low-level Cipher API: GCM(nonce, tag)
+    # takes the tag separately, so there is no ciphertext+tag concatenation
+    # (a full ciphertext-sized copy with AESGCM), and update_into writes the
+    # plaintext into a preallocated buffer.
+    plaintext = bytearray(cipher_len + _UPDATE_INTO_SLACK)
     try:
-        plaintext = cipher.decrypt(nonce, ciphertext + tag, None)
+        decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, tag)).decryptor()
+        written = decryptor.update_into(ciphertext, plaintext)
+        decryptor.finalize()
     except Exception as exc:
         raise DecryptionFailedError(
             "Decryption failed. Wrong password or data has been tampered with."
         ) from exc
-    
+
+    del plaintext[written:]
     return plaintext
 
 
 def is_encrypted(data: bytes) -> bool:
-    """Check if data starts with encryption magic."""
-    return data.startswith(MAGIC)
+    """Check if data starts with any known encryption magic."""
+    return bytes(data[:MAGIC_LEN]) in KNOWN_MAGICS
 
 
 # ── Internal helpers ──────────────────────────────────────────────────────────
 
-def _derive_key(password: str, salt: bytes) -> bytes:
+@functools.lru_cache(maxsize=128)
+def _derive_key(pw_bytes: bytes, salt: bytes, iterations: int) -> bytes:
     """
-    Derive a 256-bit (32-byte) key from password using PBKDF2-SHA256.
-    
+    Derive a 256-bit (32-byte) key from password bytes using PBKDF2-SHA256.
+
+    The result is cached per (password, salt, iterations): PBKDF2 costs
+    tens of milliseconds per call by design, and the typical
+    encode-then-decode flow derives the exact same key twice. The salt is
+    random per encrypt, so the cache never weakens the KDF — it only
+    skips recomputing a deterministic result the process already paid for.
+
     Args:
-        password: Password string
-        salt:     Salt bytes
-    
+        pw_bytes:   UTF-8 encoded password (callers encode once)
+        salt:       Salt bytes
+        iterations: PBKDF2 iteration count
+
     Returns:
         32-byte key
     """
-    kdf = pbkdf2.PBKDF2HMAC(
-        algorithm=PBKDF2_HASH_ALGO,
-        length=32,  # 256 bits
-        salt=salt,
-        iterations=PBKDF2_ITERATIONS,
-        backend=default_backend(),
-    )
-    return kdf.derive(password.encode("utf-8"))
+    # hashlib.pbkdf2_hmac calls straight into OpenSSL's PKCS5_PBKDF2_HMAC,
+    # which uses the SHA-NI instructions where the CPU has them — same
+    # derivation as cryptography's PBKDF2HMAC, minus the per-call wrapper
+    # objects and backend dispatch.
+    return hashlib.pbkdf2_hmac(PBKDF2_HASH_ALGO, pw_bytes, salt, iterations, dklen=32)
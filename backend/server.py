@@ -18,21 +18,49 @@ Unified REST API serving all 4 conversion modes:
     GET  /             → React app (served from ../frontend/build)
 """
 
+import functools
+import importlib
+import io
 import logging
+import mmap
 import os
+import queue
 import sys
+import types
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from flask import Flask, Response, jsonify, request, send_from_directory
+from flask import Flask, Response, g, jsonify, request, send_file, send_from_directory
 
-# Both codec modules live in the same directory
-sys.path.insert(0, os.path.dirname(__file__))
+# The codec modules (and, transitively, Pillow and cryptography) are not
+# imported until the first codec request: a worker that only ever answers
+# /api/health or serves the frontend never pays their import cost, and
+# gunicorn workers fork faster. Both modules live in this directory; the
+# path insert happens only when the plain import fails (e.g. launched from
+# the repo root), so dev-mode autoreloads do not touch sys.path.
+def _import_sibling(name):
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        sys.path.insert(0, os.path.dirname(__file__))
+        return importlib.import_module(name)
+
+
+@functools.lru_cache(maxsize=None)
+def _png_codec():
+    return _import_sibling("codec_png")
 
-import codec_png as png_codec
-import codec_mp3 as mp3_codec
 
-from codec_png import PngCodecError, NotAPngCodecFile, PngCorruptedError, PngVersionError
-from codec_mp3 import CodecError,    NotEncodedError,  CorruptedFileError, UnsupportedVersionError
+@functools.lru_cache(maxsize=None)
+def _mp3_codec():
+    return _import_sibling("codec_mp3")
+
+# Optional: orjson for the error-response path (3-5x stdlib json on small
+# dicts). _error falls back to jsonify when the wheel is absent.
+try:
+    import orjson as _orjson
+except ImportError:
+    _orjson = None
 
 
 # ── Configuration ─────────────────────────────────────────────────────────────
@@ -47,6 +75,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger("soundpixel")
 
+# Sampled once at startup: the per-request info logs skip their argument
+# evaluation and handler walk entirely when INFO is off (production runs
+# at WARN). Workers must restart to pick up a level change.
+_LOG_INFO = logger.isEnabledFor(logging.INFO)
+
+# All codec work funnels through one bounded pool: the hot loops (CRC, AES,
+# PNG encode) release the GIL, so they run in parallel across requests, while
+# the cap keeps a burst of concurrent uploads from oversubscribing the CPU.
+_CODEC_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+
+def _run_codec(fn, *args, **kwargs):
+    """Run a codec call on the shared pool and wait for its result."""
+    return _CODEC_POOL.submit(fn, *args, **kwargs).result()
+
 
 # ── App setup ─────────────────────────────────────────────────────────────────
 
@@ -61,11 +104,11 @@ app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
 
 # In production, set ALLOWED_ORIGIN env var to your Netlify URL.
 # Multiple origins: comma-separated  e.g. "https://a.netlify.app,https://custom.com"
-_ALLOWED_ORIGINS = {
+_ALLOWED_ORIGINS = frozenset({
     "http://localhost:3000",
     "http://127.0.0.1:3000",
     *[o.strip() for o in os.environ.get("ALLOWED_ORIGIN", "").split(",") if o.strip()],
-}
+})
 _EXPOSED_HEADERS = ", ".join([
     "Content-Disposition",
     "X-Input-Size", "X-Output-Size",
@@ -74,25 +117,79 @@ _EXPOSED_HEADERS = ", ".join([
     "X-Original-Filename",
 ])
 
-@app.after_request
-def add_cors(response: Response) -> Response:
-    origin = request.headers.get("Origin", "")
-    if origin in _ALLOWED_ORIGINS or app.debug:
-        response.headers["Access-Control-Allow-Origin"]   = origin or "*"
-        response.headers["Access-Control-Allow-Methods"]  = "GET, POST, OPTIONS"
-        response.headers["Access-Control-Allow-Headers"]  = "Content-Type"
-        response.headers["Access-Control-Expose-Headers"] = _EXPOSED_HEADERS
-    return response
+# Everything except Allow-Origin is the same on every response, so it is
+# built once here instead of per request.
+_CORS_STATIC_HEADERS = [
+    ("Access-Control-Allow-Methods",  "GET, POST, OPTIONS"),
+    ("Access-Control-Allow-Headers",  "Content-Type"),
+    ("Access-Control-Expose-Headers", _EXPOSED_HEADERS),
+]
+
+
+class _CorsMiddleware:
+    """
+    WSGI-level CORS handling.
+
+    Runs before Flask routing: /api preflight OPTIONS requests get a canned
+    204 without building a request context at all, and allowed cross-origin
+    requests get their CORS headers appended in start_response. Replaces
+    the old after_request hook + OPTIONS view, which paid full Flask
+    dispatch on every preflight.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        origin = environ.get("HTTP_ORIGIN")
+        if not origin:
+            # Non-browser clients (curl, health checks) send no Origin;
+            # skip the membership test and header writes entirely.
+            return self.wsgi_app(environ, start_response)
+
+        allowed = origin in _ALLOWED_ORIGINS or app.debug
+
+        if (
+            environ.get("REQUEST_METHOD") == "OPTIONS"
+            and environ.get("PATH_INFO", "").startswith("/api/")
+        ):
+            headers = [("Content-Length", "0")]
+            if allowed:
+                headers.append(("Access-Control-Allow-Origin", origin))
+                headers.extend(_CORS_STATIC_HEADERS)
+            start_response("204 NO CONTENT", headers)
+            return [b""]
+
+        if not allowed:
+            return self.wsgi_app(environ, start_response)
 
-@app.route("/api/<path:path>", methods=["OPTIONS"])
-def options_handler(_path):
-    return "", 204
+        def cors_start_response(status, headers, exc_info=None):
+            headers.append(("Access-Control-Allow-Origin", origin))
+            headers.extend(_CORS_STATIC_HEADERS)
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, cors_start_response)
+
+
+app.wsgi_app = _CorsMiddleware(app.wsgi_app)
 
 
 # ── Shared helpers ────────────────────────────────────────────────────────────
 
+# Fixed error strings formatted once at import instead of per request.
+_ERR_TOO_LARGE     = f"File too large. Maximum upload size is {MAX_UPLOAD_MB} MB."
+_ERR_NOT_FOUND     = "Endpoint not found."
+_ERR_SERVER        = "Internal server error."
+_ERR_MISSING_FIELD = (
+    "Missing file field '{}'. "
+    "Send a multipart/form-data request with the correct field name."
+)
+
+
 def _error(message: str, status: int = 400) -> tuple[Response, int]:
     """Return a JSON error response."""
+    if _orjson is not None:
+        return Response(_orjson.dumps({"error": message}), mimetype="application/json"), status
     return jsonify({"error": message}), status
 
 
@@ -103,15 +200,94 @@ def _require_file(field: str):
     """
     f = request.files.get(field)
     if not f or not f.filename:
-        return None, _error(
-            f"Missing file field '{field}'. "
-            "Send a multipart/form-data request with the correct field name."
-        )
+        return None, _error(_ERR_MISSING_FIELD.format(field))
     return f, None
 
 
-# MIME type map for common file extensions
-_MIME_TYPES = {
+# ── Scratch buffer pool ───────────────────────────────────────────────────────
+
+# Upload buffers for the non-mmap read path are recycled through power-of-two
+# size buckets instead of being reallocated per request: repeated multi-MB
+# bytearray churn fragments the allocator under sustained load. Buffers go
+# back to their bucket when the request tears down; each bucket keeps at most
+# _POOL_DEPTH idle buffers so the pool's resident size stays bounded.
+_POOL_BUCKETS = (1 << 20, 4 << 20, 16 << 20, 64 << 20, MAX_UPLOAD_BYTES)
+_BUFFER_POOL  = {size: queue.SimpleQueue() for size in _POOL_BUCKETS}
+_POOL_DEPTH   = 4
+
+
+def _acquire_buffer(size: int) -> bytearray:
+    """A bytearray of at least size bytes, reused from the pool if possible."""
+    for bucket in _POOL_BUCKETS:
+        if size <= bucket:
+            try:
+                return _BUFFER_POOL[bucket].get_nowait()
+            except queue.Empty:
+                return bytearray(bucket)
+    return bytearray(size)  # over the largest bucket: not pooled
+
+
+def _release_buffer(buf: bytearray) -> None:
+    """Return buf to its bucket, dropping it if the bucket is full."""
+    bucket = _BUFFER_POOL.get(len(buf))
+    if bucket is not None and bucket.qsize() < _POOL_DEPTH:
+        bucket.put(buf)
+
+
+@app.teardown_request
+def _return_scratch_buffers(_exc):
+    for buf in g.pop("_scratch_buffers", ()):
+        _release_buffer(buf)
+
+
+def _read_upload(f):
+    """
+    Return an upload's content as a bytes-like object, avoiding a copy
+    where possible.
+
+    Werkzeug spools uploads past 500 KB to a real temp file; those are
+    memory-mapped and handed to the codecs as a memoryview backed by the
+    kernel page cache, instead of being read into a private bytes copy
+    (which doubles RSS per concurrent 200 MB request). Small in-memory
+    spools and streams without a file descriptor fall back to read().
+    """
+    stream = f.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+
+    # In-memory spools (SpooledTemporaryFile before rollover, plain BytesIO)
+    # are drained straight into a pooled buffer: asking them for a fileno()
+    # would force a rollover to disk just so we could mmap the result.
+    in_memory = isinstance(stream, io.BytesIO) or not getattr(stream, "_rolled", True)
+    if not in_memory:
+        try:
+            mm = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+            # The mapping stays alive for as long as views into it exist, so
+            # no explicit close is needed — refcounting reclaims it after
+            # the request.
+            return memoryview(mm)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            pass  # zero-length or unmappable stream: read it like a spool
+
+    # readinto() a pooled buffer of known size, instead of read()'s
+    # grow-and-copy into a fresh bytes object.
+    buf  = _acquire_buffer(size)
+    g.setdefault("_scratch_buffers", []).append(buf)
+    view = memoryview(buf)[:size]
+    pos  = 0
+    while pos < size:
+        n = stream.readinto(view[pos:])
+        if not n:
+            break
+        pos += n
+    return view[:pos]
+
+
+# MIME type map for common file extensions, frozen so nothing can mutate it
+# at runtime. Every response header points at the same shared string object
+# instead of a per-request copy.
+_MIME_TYPES = types.MappingProxyType({
     # Audio
     "mp3": "audio/mpeg", "wav": "audio/wav", "flac": "audio/flac",
     "ogg": "audio/ogg",  "aac": "audio/aac", "m4a":  "audio/mp4",
@@ -120,11 +296,18 @@ _MIME_TYPES = {
     "png": "image/png",  "jpg": "image/jpeg", "jpeg":"image/jpeg",
     "gif": "image/gif",  "webp":"image/webp",  "bmp": "image/bmp",
     "tiff":"image/tiff", "svg": "image/svg+xml",
-}
+})
+_OCTET_STREAM = sys.intern("application/octet-stream")
 
+@functools.lru_cache(maxsize=1024)
 def _mime_for(filename: str) -> str:
-    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
-    return _MIME_TYPES.get(ext, "application/octet-stream")
+    """MIME type for filename; cached since clients reuse a handful of names."""
+    # rfind + slice: one allocation for the extension, versus rsplit's
+    # list plus two string objects.
+    i = filename.rfind(".")
+    if i < 0:
+        return _OCTET_STREAM
+    return _MIME_TYPES.get(filename[i + 1 :].lower(), _OCTET_STREAM)
 
 
 # ── Health ────────────────────────────────────────────────────────────────────
@@ -157,36 +340,47 @@ def png_encode():
     if err:
         return err
 
-    raw      = f.read()
+    raw      = _read_upload(f)
     filename = f.filename or "file.bin"
     password = request.form.get("password")  # Optional
 
-    logger.info("PNG encode: '%s' (%d B)%s", 
-                filename, len(raw), 
-                " [encrypted]" if password else "")
+    if _LOG_INFO:
+        logger.info("PNG encode: '%s' (%d B)%s", 
+                    filename, len(raw), 
+                    " [encrypted]" if password else "")
 
     try:
-        result = png_codec.encode(raw, filename, password=password)
+        result = _run_codec(_png_codec().encode, raw, filename, password=password)
     except Exception as exc:
         logger.exception("PNG encode failed for '%s'", filename)
         return _error(f"Encoding failed: {exc}", 500)
 
-    stem     = filename.rsplit(".", 1)[0] if "." in filename else filename
-    out_name = f"{stem}_soundpixel.png"
-
-    resp = Response(result.png_bytes, mimetype="image/png")
-    resp.headers["Content-Disposition"] = f'attachment; filename="{out_name}"'
+    # rfind + slice + concat: one scan and no intermediate rsplit list
+    i        = filename.rfind(".")
+    out_name = (filename[:i] if i >= 0 else filename) + "_soundpixel.png"
+
+    # send_file hands the payload to the WSGI server as a file-like, so
+    # gunicorn/waitress serve it through wsgi.file_wrapper instead of
+    # iterating a materialized byte string chunk-by-chunk.
+    resp = send_file(
+        io.BytesIO(result.png_bytes),
+        mimetype="image/png",
+        as_attachment=True,
+        download_name=out_name,
+        conditional=True,
+    )
     resp.headers["X-Image-Width"]  = str(result.image_width)
     resp.headers["X-Image-Height"] = str(result.image_height)
     resp.headers["X-Input-Size"]   = str(result.input_size)
     resp.headers["X-Output-Size"]  = str(len(result.png_bytes))
     resp.headers["X-Encrypted"]    = "true" if password else "false"
 
-    logger.info(
-        "PNG encode done: %dx%d, %d B → %d B",
-        result.image_width, result.image_height,
-        result.input_size, len(result.png_bytes),
-    )
+    if _LOG_INFO:
+        logger.info(
+            "PNG encode done: %dx%d, %d B → %d B",
+            result.image_width, result.image_height,
+            result.input_size, len(result.png_bytes),
+        )
     return resp
 
 
@@ -203,29 +397,35 @@ def png_decode():
     if err:
         return err
 
-    raw = f.read()
+    raw = _read_upload(f)
     password = request.form.get("password")  # Optional
 
-    logger.info("PNG decode: '%s' (%d B)%s", 
-                f.filename, len(raw),
-                " [with password]" if password else "")
+    if _LOG_INFO:
+        logger.info("PNG decode: '%s' (%d B)%s", 
+                    f.filename, len(raw),
+                    " [with password]" if password else "")
 
+    codec = _png_codec()
     try:
-        result = png_codec.decode(raw, password=password)
-    except NotAPngCodecFile  as exc: return _error(str(exc), 422)
-    except PngCorruptedError as exc: return _error(str(exc), 422)
-    except PngVersionError   as exc: return _error(str(exc), 422)
-    except PngCodecError     as exc: return _error(str(exc), 422)
-    except Exception         as exc:
+        result = _run_codec(codec.decode, raw, password=password)
+    except codec.PngCodecError as exc:
+        # Covers NotAPngCodecFile, PngCorruptedError and PngVersionError —
+        # all client-side problems with the uploaded file.
+        return _error(str(exc), 422)
+    except Exception as exc:
         logger.exception("PNG decode failed")
         return _error(f"Decoding failed: {exc}", 500)
 
     resp = Response(result.data, mimetype=_mime_for(result.filename))
+    # Explicit Content-Length keeps HTTP/1.1 keep-alive clients off the
+    # chunked-encoding path, so they can pipeline the next request.
+    resp.content_length = result.data_size
     resp.headers["Content-Disposition"]  = f'attachment; filename="{result.filename}"'
     resp.headers["X-Original-Filename"]  = result.filename
     resp.headers["X-Output-Size"]        = str(result.data_size)
 
-    logger.info("PNG decode done: '%s' (%d B)", result.filename, result.data_size)
+    if _LOG_INFO:
+        logger.info("PNG decode done: '%s' (%d B)", result.filename, result.data_size)
     return resp
 
 
@@ -250,37 +450,41 @@ def mp3_encode():
     if err:
         return err
 
-    mp3_bytes   = mp3_file.read()
-    image_bytes = img_file.read()
+    mp3_bytes   = _read_upload(mp3_file)
+    image_bytes = _read_upload(img_file)
     image_name  = img_file.filename or "image.png"
     password    = request.form.get("password")  # Optional
 
-    logger.info(
-        "MP3 encode: embed '%s' (%d B) into '%s' (%d B)%s",
-        image_name, len(image_bytes), mp3_file.filename, len(mp3_bytes),
-        " [encrypted]" if password else "",
-    )
+    if _LOG_INFO:
+        logger.info(
+            "MP3 encode: embed '%s' (%d B) into '%s' (%d B)%s",
+            image_name, len(image_bytes), mp3_file.filename, len(mp3_bytes),
+            " [encrypted]" if password else "",
+        )
 
     try:
-        result = mp3_codec.encode(mp3_bytes, image_bytes, image_name, password=password)
+        result = _run_codec(_mp3_codec().encode, mp3_bytes, image_bytes, image_name, password=password)
     except Exception as exc:
         logger.exception("MP3 encode failed")
         return _error(f"Encoding failed: {exc}", 500)
 
-    stem     = (mp3_file.filename or "audio").rsplit(".", 1)[0]
-    out_name = f"{stem}_soundpixel.mp3"
+    src_name = mp3_file.filename or "audio"
+    i        = src_name.rfind(".")
+    out_name = (src_name[:i] if i >= 0 else src_name) + "_soundpixel.mp3"
 
     resp = Response(result.mp3_bytes, mimetype="audio/mpeg")
+    resp.content_length = result.total_size
     resp.headers["Content-Disposition"] = f'attachment; filename="{out_name}"'
     resp.headers["X-Mp3-Size"]   = str(result.mp3_size)
     resp.headers["X-Image-Size"] = str(result.image_size)
     resp.headers["X-Total-Size"] = str(result.total_size)
     resp.headers["X-Encrypted"]  = "true" if password else "false"
 
-    logger.info(
-        "MP3 encode done: audio=%d B + image=%d B → %d B",
-        result.mp3_size, result.image_size, result.total_size,
-    )
+    if _LOG_INFO:
+        logger.info(
+            "MP3 encode done: audio=%d B + image=%d B → %d B",
+            result.mp3_size, result.image_size, result.total_size,
+        )
     return resp
 
 
@@ -297,29 +501,33 @@ def mp3_decode():
     if err:
         return err
 
-    raw = f.read()
+    raw = _read_upload(f)
     password = request.form.get("password")  # Optional
 
-    logger.info("MP3 decode: '%s' (%d B)%s", 
-                f.filename, len(raw),
-                " [with password]" if password else "")
+    if _LOG_INFO:
+        logger.info("MP3 decode: '%s' (%d B)%s", 
+                    f.filename, len(raw),
+                    " [with password]" if password else "")
 
+    codec = _mp3_codec()
     try:
-        result = mp3_codec.decode(raw, password=password)
-    except NotEncodedError       as exc: return _error(str(exc), 422)
-    except CorruptedFileError    as exc: return _error(str(exc), 422)
-    except UnsupportedVersionError as exc: return _error(str(exc), 422)
-    except CodecError            as exc: return _error(str(exc), 422)
-    except Exception             as exc:
+        result = _run_codec(codec.decode, raw, password=password)
+    except codec.CodecError as exc:
+        # Covers NotEncodedError, CorruptedFileError and
+        # UnsupportedVersionError — all client-side problems.
+        return _error(str(exc), 422)
+    except Exception as exc:
         logger.exception("MP3 decode failed")
         return _error(f"Decoding failed: {exc}", 500)
 
     resp = Response(result.image_data, mimetype=_mime_for(result.image_filename))
+    resp.content_length = result.image_size
     resp.headers["Content-Disposition"] = f'attachment; filename="{result.image_filename}"'
     resp.headers["X-Original-Filename"] = result.image_filename
     resp.headers["X-Output-Size"]       = str(result.image_size)
 
-    logger.info("MP3 decode done: '%s' (%d B)", result.image_filename, result.image_size)
+    if _LOG_INFO:
+        logger.info("MP3 decode done: '%s' (%d B)", result.image_filename, result.image_size)
     return resp
 
 
@@ -339,15 +547,15 @@ if FRONTEND_BUILD.exists():
 
 @app.errorhandler(413)
 def too_large(_e):
-    return _error(f"File too large. Maximum upload size is {MAX_UPLOAD_MB} MB.", 413)
+    return _error(_ERR_TOO_LARGE, 413)
 
 @app.errorhandler(404)
 def not_found(_e):
-    return _error("Endpoint not found.", 404)
+    return _error(_ERR_NOT_FOUND, 404)
 
 @app.errorhandler(500)
 def server_error(_e):
-    return _error("Internal server error.", 500)
+    return _error(_ERR_SERVER, 500)
 
 
 # ── Entry point ───────────────────────────────────────────────────────────────
@@ -356,4 +564,21 @@ if __name__ == "__main__":
     port  = int(os.environ.get("PORT", "5000"))
     debug = os.environ.get("FLASK_DEBUG", "1") == "1"
     logger.info("SoundPixel API — port %d  debug=%s", port, debug)
-    app.run(host="0.0.0.0", port=port, debug=debug)
\ No newline at end of file
+
+    if debug:
+        app.run(host="0.0.0.0", port=port, debug=True)
+    else:
+        # Werkzeug's dev server handles one request at a time; for real use
+        # hand off to gunicorn with threaded workers (the hot paths — CRC,
+        # AES-GCM, PNG encode — all release the GIL, so threads scale).
+        # Docker and Render already launch gunicorn directly; this covers
+        # bare `python server.py` deployments.
+        workers = os.environ.get("WEB_CONCURRENCY", str(os.cpu_count() or 1))
+        try:
+            os.execvp("gunicorn", [
+                "gunicorn", "-w", workers, "-k", "gthread", "--threads", "4",
+                "-b", f"0.0.0.0:{port}", "server:app",
+            ])
+        except OSError:
+            logger.warning("gunicorn not found — falling back to the Flask dev server")
+            app.run(host="0.0.0.0", port=port)
\ No newline at end of file
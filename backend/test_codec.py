@@ -5,23 +5,62 @@ Run with: python test_codec.py
 
 import io
 import os
+import random
 import sys
 import zlib
 
-sys.path.insert(0, os.path.dirname(__file__))
-
-from codec import (
-    CorruptedFileError,
-    NotEncodedError,
-    decode,
-    encode,
-    TAIL_MAGIC,
-)
+from PIL import Image
+
+# Path insert only if the module is not already importable (e.g. run from
+# the repo root), keeping re-imports from touching sys.path.
+try:
+    from codec import (
+        CorruptedFileError,
+        NotEncodedError,
+        decode,
+        encode,
+        TAIL_MAGIC,
+    )
+except ImportError:
+    sys.path.insert(0, os.path.dirname(__file__))
+    from codec import (
+        CorruptedFileError,
+        NotEncodedError,
+        decode,
+        encode,
+        TAIL_MAGIC,
+    )
 
 PASS = "\033[92m✓\033[0m"
 FAIL = "\033[91m✗\033[0m"
 _results = []
 
+# Deterministic payload pool: one seeded randbytes() replaces the dozens of
+# getrandom(2) syscalls os.urandom made per run, and makes any failure
+# reproducible under the same seed.
+_RNG  = random.Random(0xC0DE)
+_POOL = _RNG.randbytes(4 * 1024 * 1024)
+
+
+def rnd(n, _off=[0]):
+    """Slice n pseudo-random bytes out of the shared pool."""
+    s = _off[0]
+    if s + n > len(_POOL):
+        s = 0
+    _off[0] = s + n
+    return _POOL[s:s + n]
+
+
+_TESTS = []
+
+
+def test(name):
+    """Register fn under name; the whole suite runs in one pass at the bottom."""
+    def deco(fn):
+        _TESTS.append((name, fn))
+        return fn
+    return deco
+
 
 def run(name, fn):
     try:
@@ -36,87 +75,87 @@ def run(name, fn):
         _results.append(False)
 
 
-print("\nSoundPixel Codec v2 Tests\n" + "─" * 44)
 
 
+@test("Basic round-trip: MP3 + PNG")
 def t_basic_roundtrip():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(4096)
-    img = os.urandom(1024)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(4096)
+    img = rnd(1024)
     enc = encode(mp3, img, "photo.png")
     dec = decode(enc.mp3_bytes)
     assert dec.image_data == img
     assert dec.image_filename == "photo.png"
     assert dec.image_size == len(img)
-run("Basic round-trip: MP3 + PNG", t_basic_roundtrip)
 
 
+@test("MP3 audio portion is preserved untouched")
 def t_mp3_preserved():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(8192)
-    img = os.urandom(512)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(8192)
+    img = rnd(512)
     enc = encode(mp3, img, "pic.jpg")
     assert enc.mp3_bytes[:len(mp3)] == mp3, "MP3 audio was modified"
     assert enc.mp3_size == len(mp3)
-run("MP3 audio portion is preserved untouched", t_mp3_preserved)
 
 
+@test("Large image (2 MB) round-trip")
 def t_large_image():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(1024)
-    img = os.urandom(2 * 1024 * 1024)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(1024)
+    img = rnd(2 * 1024 * 1024)
     dec = decode(encode(mp3, img, "big.png").mp3_bytes)
     assert dec.image_data == img
-run("Large image (2 MB) round-trip", t_large_image)
 
 
+@test("Unicode filename preserved")
 def t_unicode_filename():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(256)
-    enc = encode(mp3, os.urandom(256), "фото_отпуск.png")
+    mp3 = b"\xff\xfb\x90\x00" + rnd(256)
+    enc = encode(mp3, rnd(256), "фото_отпуск.png")
     dec = decode(enc.mp3_bytes)
     assert dec.image_filename == "фото_отпуск.png"
-run("Unicode filename preserved", t_unicode_filename)
 
 
+@test("Filename truncated at 255 bytes")
 def t_fname_truncated():
     long_name = "a" * 300 + ".png"
-    enc = encode(b"\xff\xfb\x90\x00" + os.urandom(256), os.urandom(64), long_name)
+    enc = encode(b"\xff\xfb\x90\x00" + rnd(256), rnd(64), long_name)
     dec = decode(enc.mp3_bytes)
     assert len(dec.image_filename.encode("utf-8")) <= 255
-run("Filename truncated at 255 bytes", t_fname_truncated)
 
 
+@test("Encode is idempotent (re-encoding replaces block)")
 def t_idempotent():
-    mp3  = b"\xff\xfb\x90\x00" + os.urandom(512)
-    img1 = os.urandom(256)
-    img2 = os.urandom(512)
+    mp3  = b"\xff\xfb\x90\x00" + rnd(512)
+    img1 = rnd(256)
+    img2 = rnd(512)
     enc1 = encode(mp3, img1, "first.png")
     enc2 = encode(enc1.mp3_bytes, img2, "second.png")
     dec  = decode(enc2.mp3_bytes)
     assert dec.image_data == img2
     assert dec.image_filename == "second.png"
     assert enc2.mp3_bytes[:len(mp3)] == mp3
-run("Encode is idempotent (re-encoding replaces block)", t_idempotent)
 
 
+@test("NotEncodedError: plain MP3 with no block")
 def t_not_encoded_plain():
     try:
-        decode(b"\xff\xfb\x90\x00" + os.urandom(1024))
+        decode(b"\xff\xfb\x90\x00" + rnd(1024))
         assert False, "should have raised"
     except NotEncodedError:
         pass
-run("NotEncodedError: plain MP3 with no block", t_not_encoded_plain)
 
 
+@test("NotEncodedError: empty bytes")
 def t_not_encoded_empty():
     try:
         decode(b"")
         assert False, "should have raised"
     except NotEncodedError:
         pass
-run("NotEncodedError: empty bytes", t_not_encoded_empty)
 
 
+@test("CorruptedFileError: CRC mismatch")
 def t_crc_mismatch():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(512)
-    img = os.urandom(256)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(512)
+    img = rnd(256)
     enc = encode(mp3, img, "test.png")
     data = bytearray(enc.mp3_bytes)
     # Flip a byte inside the image data (after header ~60 bytes in)
@@ -127,85 +166,93 @@ def t_crc_mismatch():
         assert False, "should have raised"
     except (CorruptedFileError, NotEncodedError):
         pass
-run("CorruptedFileError: CRC mismatch", t_crc_mismatch)
 
 
+@test("NotEncodedError: tail magic removed (truncated)")
 def t_tail_removed():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(512)
-    enc = encode(mp3, os.urandom(128), "test.png")
+    mp3 = b"\xff\xfb\x90\x00" + rnd(512)
+    enc = encode(mp3, rnd(128), "test.png")
     try:
         decode(enc.mp3_bytes[:-8])
         assert False, "should have raised"
     except NotEncodedError:
         pass
-run("NotEncodedError: tail magic removed (truncated)", t_tail_removed)
 
 
+@test("EncodeResult metadata is accurate")
 def t_metadata():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(2048)
-    img = os.urandom(512)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(2048)
+    img = rnd(512)
     enc = encode(mp3, img, "meta.png")
     assert enc.mp3_size   == len(mp3)
     assert enc.image_size == len(img)
     assert enc.total_size == len(enc.mp3_bytes)
     assert enc.total_size > len(mp3)
-run("EncodeResult metadata is accurate", t_metadata)
 
 
+@test("DecodeResult size matches actual data")
 def t_decode_size():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(512)
-    img = os.urandom(999)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(512)
+    img = rnd(999)
     dec = decode(encode(mp3, img, "size.png").mp3_bytes)
     assert dec.image_size == len(img)
     assert dec.image_size == len(dec.image_data)
-run("DecodeResult size matches actual data", t_decode_size)
 
 
+@test("All-zero image bytes round-trip")
 def t_zeros():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(256)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(256)
     img = bytes(5000)
     dec = decode(encode(mp3, img, "zeros.png").mp3_bytes)
     assert dec.image_data == img
-run("All-zero image bytes round-trip", t_zeros)
 
 
+@test("All-255 image bytes round-trip")
 def t_max_bytes():
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(256)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(256)
     img = bytes([255] * 5000)
     dec = decode(encode(mp3, img, "max.png").mp3_bytes)
     assert dec.image_data == img
-run("All-255 image bytes round-trip", t_max_bytes)
 
 
+# Scratch buffer shared by the real-image tests; rewound and truncated
+# between uses instead of reallocating a BytesIO per test.
+_IMG_BUF = io.BytesIO()
+
+
+@test("Real JPEG image round-trip")
 def t_jpg_roundtrip():
-    from PIL import Image
     img_obj = Image.new("RGB", (200, 200), color=(220, 100, 50))
-    buf = io.BytesIO()
-    img_obj.save(buf, format="JPEG")
-    jpg_bytes = buf.getvalue()
+    _IMG_BUF.seek(0)
+    _IMG_BUF.truncate()
+    img_obj.save(_IMG_BUF, format="JPEG")
+    jpg_bytes = _IMG_BUF.getvalue()
 
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(1024)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(1024)
     enc = encode(mp3, jpg_bytes, "photo.jpg")
     dec = decode(enc.mp3_bytes)
     assert dec.image_data == jpg_bytes
     assert dec.image_filename == "photo.jpg"
-run("Real JPEG image round-trip", t_jpg_roundtrip)
 
 
+@test("Real PNG image round-trip")
 def t_png_roundtrip():
-    from PIL import Image
     img_obj = Image.new("RGBA", (150, 150), color=(0, 128, 255, 200))
-    buf = io.BytesIO()
-    img_obj.save(buf, format="PNG")
-    png_bytes = buf.getvalue()
+    _IMG_BUF.seek(0)
+    _IMG_BUF.truncate()
+    img_obj.save(_IMG_BUF, format="PNG")
+    png_bytes = _IMG_BUF.getvalue()
 
-    mp3 = b"\xff\xfb\x90\x00" + os.urandom(1024)
+    mp3 = b"\xff\xfb\x90\x00" + rnd(1024)
     enc = encode(mp3, png_bytes, "transparent.png")
     dec = decode(enc.mp3_bytes)
     assert dec.image_data == png_bytes
-run("Real PNG image round-trip", t_png_roundtrip)
 
 
+print("\nSoundPixel Codec v2 Tests\n" + "─" * 44)
+for _name, _fn in _TESTS:
+    run(_name, _fn)
+
 print("\n" + "─" * 44)
 passed = sum(_results)
 failed = len(_results) - passed
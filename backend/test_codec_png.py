@@ -0,0 +1,182 @@
+"""
+SoundPixel PNG Codec — Test Suite
+Run with: python test_codec_png.py
+"""
+
+import hashlib
+import os
+import random
+import struct
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# Path insert only if the module is not already importable (e.g. run from
+# the repo root), keeping re-imports from touching sys.path.
+try:
+    from codec_png import (
+        NotAPngCodecFile,
+        PngCorruptedError,
+        decode,
+        encode,
+    )
+except ImportError:
+    sys.path.insert(0, os.path.dirname(__file__))
+    from codec_png import (
+        NotAPngCodecFile,
+        PngCorruptedError,
+        decode,
+        encode,
+    )
+
+PASS = "\033[92m✓\033[0m"
+FAIL = "\033[91m✗\033[0m"
+_results = []
+
+# Deterministic payload pool, same scheme as test_codec.py: one seeded
+# randbytes() instead of a getrandom(2) syscall per payload.
+_RNG  = random.Random(0xC0DE)
+_POOL = _RNG.randbytes(4 * 1024 * 1024)
+
+
+def rnd(n, _off=[0]):
+    """Slice n pseudo-random bytes out of the shared pool."""
+    s = _off[0]
+    if s + n > len(_POOL):
+        s = 0
+    _off[0] = s + n
+    return _POOL[s:s + n]
+
+
+_TESTS = []
+
+
+def test(name):
+    """Register fn under name; the whole suite runs in one pass at the bottom."""
+    def deco(fn):
+        _TESTS.append((name, fn))
+        return fn
+    return deco
+
+
+def run(name, fn):
+    try:
+        fn()
+        print(f"  {PASS}  {name}")
+        _results.append(True)
+    except AssertionError as e:
+        print(f"  {FAIL}  {name}  →  {e}")
+        _results.append(False)
+    except Exception as e:
+        print(f"  {FAIL}  {name}  →  {type(e).__name__}: {e}")
+        _results.append(False)
+
+
+
+
+@test("Basic round-trip: file → PNG → file")
+def t_basic_roundtrip():
+    data = rnd(4096)
+    enc = encode(data, "track.mp3")
+    dec = decode(enc.png_bytes)
+    assert dec.data == data
+    assert dec.filename == "track.mp3"
+    assert dec.data_size == len(data)
+
+
+@test("Large random payload (1 MB) round-trip")
+def t_large_roundtrip():
+    data = rnd(1024 * 1024)
+    dec = decode(encode(data, "large.bin").png_bytes)
+    # Compare digests, not the buffers: b"=="-ing two 1 MiB objects keeps
+    # both resident until the bool comes back, while the hashes read through
+    # zero-copy views and let the payloads be freed right after.
+    assert (
+        hashlib.blake2b(memoryview(data)).digest()
+        == hashlib.blake2b(memoryview(dec.data)).digest()
+    ), "payload digest mismatch"
+    assert dec.data_size == len(data)
+    del dec
+
+
+@test("Payload length is exact across 12 sizes (parallel)")
+def t_exact_lengths():
+    # Encode the twelve sizes in parallel: the codec's CRC and deflate work
+    # release the GIL, so a thread pool overlaps them across cores. Payloads
+    # are sliced up front because rnd()'s offset cursor is not thread-safe.
+    sizes    = [1, 2, 3, 4, 100, 1023, 1024, 4095, 4096, 12288, 65537, 200000]
+    payloads = {n: rnd(n) for n in sizes}
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as ex:
+        encoded = list(ex.map(
+            lambda n: (n, encode(payloads[n], f"{n}.bin").png_bytes), sizes
+        ))
+    for n, png_bytes in encoded:
+        dec = decode(png_bytes)
+        assert dec.data == payloads[n], f"size {n}: payload mismatch"
+        assert dec.data_size == n, f"size {n}: reported {dec.data_size}"
+
+
+# PNG file signature (also defined by the codec as _PNG_SIGNATURE)
+_PNG_SIG   = b"\x89PNG\r\n\x1a\n"
+# Compiled once, as in the codec modules, instead of re-parsing ">I"/">II"
+# format strings inside the helpers.
+_U32       = struct.Struct(">I")
+_IHDR_DIMS = struct.Struct(">II")
+
+
+@test("Output is a valid PNG (signature + IHDR)")
+def t_valid_png():
+    enc = encode(rnd(1024), "sig.bin")
+    # Check the container bytes directly — no need to drag Pillow's lazy
+    # loader through Image.open just to read img.format.
+    assert enc.png_bytes[:8] == _PNG_SIG, "bad PNG signature"
+    assert enc.png_bytes[12:16] == b"IHDR", "IHDR is not the first chunk"
+    width, height = _IHDR_DIMS.unpack_from(enc.png_bytes, 16)
+    assert (width, height) == (enc.image_width, enc.image_height)
+
+
+def _flip_pixel_byte(png_bytes, offset):
+    """Flip one byte of the pixel stream by patching the IDAT chunk in place.
+
+    Works on the raw container instead of re-encoding through Pillow (open,
+    convert, save — a full filter+deflate pass just to flip one bit). The
+    level-0 recompress of the patched scanline stream is a plain memcpy, and
+    the chunk CRC is reframed so the PNG itself stays well-formed — only the
+    payload is wrong, which is exactly what the codec's CRC must catch.
+    """
+    buf        = bytearray(png_bytes)
+    tag        = buf.find(b"IDAT")
+    length     = _U32.unpack_from(buf, tag - 4)[0]
+    filtered   = bytearray(zlib.decompress(buf[tag + 4 : tag + 4 + length]))
+    filtered[offset] ^= 0xFF
+    body  = zlib.compress(bytes(filtered), 0)
+    crc   = zlib.crc32(body, zlib.crc32(b"IDAT")) & 0xFFFFFFFF
+    chunk = _U32.pack(len(body)) + b"IDAT" + body + _U32.pack(crc)
+    return bytes(buf[: tag - 4]) + chunk + bytes(buf[tag + 8 + length :])
+
+
+@test("PngCorruptedError: flipped payload byte fails CRC")
+def t_crc_mismatch():
+    data = rnd(2048)
+    enc = encode(data, "flip.bin")
+    # Offset 150 is past the filter byte and the ~30-byte SoundPixel header,
+    # safely inside the payload region of the first scanline.
+    tampered = _flip_pixel_byte(enc.png_bytes, 150)
+    try:
+        decode(tampered)
+        assert False, "should have raised"
+    except PngCorruptedError:
+        pass
+
+
+print("\nSoundPixel PNG Codec Tests\n" + "─" * 44)
+for _name, _fn in _TESTS:
+    run(_name, _fn)
+
+print("\n" + "─" * 44)
+passed = sum(_results)
+failed = len(_results) - passed
+color  = "\033[92m" if failed == 0 else "\033[91m"
+print(f"{color}Results: {passed} passed, {failed} failed out of {len(_results)} tests\033[0m\n")
+if failed:
+    sys.exit(1)
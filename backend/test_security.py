@@ -1,107 +1,172 @@
 #!/usr/bin/env python3
 """
 Quick security tests to verify AES-256-GCM encryption works
+
+The five subtests are self-contained and run on a multiprocessing pool:
+PBKDF2 dominates their wall-time and is pure CPU, so separate processes
+scale it across cores.
 """
+import hashlib
+import hmac
+import multiprocessing
 import sys
+import traceback
+
 import encryption
 import codec_png
 import codec_mp3
 
-def test_encryption():
-    print("=" * 60)
-    print("SECURITY TEST: AES-256-GCM Encryption")
-    print("=" * 60)
-    
-    # Test 1: Encryption module
-    print("\n1. Testing encryption.py module...")
+
+def _same_bytes(a, b):
+    """Constant-time equality via fixed-size digests instead of a full ==."""
+    return hmac.compare_digest(
+        hashlib.blake2b(a).digest(), hashlib.blake2b(b).digest()
+    )
+
+
+def test_1_encryption_module():
     plaintext = b"Secret data" * 100
     password = "MyPassword123!"
-    
+
     encrypted = encryption.encrypt(plaintext, password)
-    print(f"   ✓ Encrypted {len(plaintext)} bytes → {len(encrypted)} bytes")
-    print(f"   ✓ Overhead: {len(encrypted) - len(plaintext)} bytes (salt + nonce + tag + padding)")
-    
+    lines = [
+        f"   ✓ Encrypted {len(plaintext)} bytes → {len(encrypted)} bytes",
+        f"   ✓ Overhead: {len(encrypted) - len(plaintext)} bytes (salt + nonce + tag + padding)",
+    ]
+
     decrypted = encryption.decrypt(encrypted, password)
-    assert decrypted == plaintext, "Decryption mismatch!"
-    print(f"   ✓ Decryption works correctly")
-    
-    # Test 2: PNG codec with encryption
-    print("\n2. Testing PNG codec with encryption...")
+    assert _same_bytes(decrypted, plaintext), "Decryption mismatch!"
+    lines.append("   ✓ Decryption works correctly")
+
+    # The iteration count sits in the unauthenticated header (bytes 52-55);
+    # forged counts must be rejected up front, not fed into PBKDF2.
+    for forged_count in (0, 0xFFFFFFFF):
+        forged = bytearray(encrypted)
+        forged[52:56] = forged_count.to_bytes(4, "big")
+        try:
+            encryption.decrypt(bytes(forged), password)
+            assert False, f"iteration count {forged_count} was accepted!"
+        except encryption.DecryptionFailedError:
+            pass
+    lines.append("   ✓ Forged PBKDF2 iteration counts rejected")
+    return lines
+
+
+def test_2_png_codec():
     test_data = b"MP3 AUDIO DATA" * 200
     filename = "audio.mp3"
     password = "SecurePassword456"
-    
-    # Encode without password
+
     result_plain = codec_png.encode(test_data, filename)
-    print(f"   ✓ Plain PNG: {len(result_plain.png_bytes)} bytes")
-    
-    # Decode plain
+    lines = [f"   ✓ Plain PNG: {len(result_plain.png_bytes)} bytes"]
+
     decoded_plain = codec_png.decode(result_plain.png_bytes)
-    assert decoded_plain.data == test_data
-    print(f"   ✓ Plain PNG round-trip successful")
-    
-    # Encode with password
+    assert _same_bytes(decoded_plain.data, test_data)
+    lines.append("   ✓ Plain PNG round-trip successful")
+
     result_encrypted = codec_png.encode(test_data, filename, password=password)
-    print(f"   ✓ Encrypted PNG: {len(result_encrypted.png_bytes)} bytes")
-    
-    # Decode encrypted
+    lines.append(f"   ✓ Encrypted PNG: {len(result_encrypted.png_bytes)} bytes")
+
     decoded_encrypted = codec_png.decode(result_encrypted.png_bytes, password=password)
-    assert decoded_encrypted.data == test_data
-    print(f"   ✓ Encrypted PNG round-trip successful")
-    
-    # Test 3: MP3 codec with encryption
-    print("\n3. Testing MP3 codec with encryption...")
+    assert _same_bytes(decoded_encrypted.data, test_data)
+    lines.append("   ✓ Encrypted PNG round-trip successful")
+    return lines
+
+
+def test_3_mp3_codec():
     mp3_data = b"ID3" + b"\x00" * 1000  # Fake MP3 with ID3 tag
     image_data = b"PNG_IMAGE_DATA" * 150
     image_name = "image.png"
     password = "AudioPassword789"
-    
-    # Encode plain MP3
+
     mp3_plain = codec_mp3.encode(mp3_data, image_data, image_name)
-    print(f"   ✓ Plain MP3: {len(mp3_plain.mp3_bytes)} bytes")
-    
-    # Decode plain
+    lines = [f"   ✓ Plain MP3: {len(mp3_plain.mp3_bytes)} bytes"]
+
     decoded_mp3_plain = codec_mp3.decode(mp3_plain.mp3_bytes)
-    assert decoded_mp3_plain.image_data == image_data
-    print(f"   ✓ Plain MP3 round-trip successful")
-    
-    # Encode encrypted MP3
+    assert _same_bytes(decoded_mp3_plain.image_data, image_data)
+    lines.append("   ✓ Plain MP3 round-trip successful")
+
     mp3_encrypted = codec_mp3.encode(mp3_data, image_data, image_name, password=password)
-    print(f"   ✓ Encrypted MP3: {len(mp3_encrypted.mp3_bytes)} bytes")
-    
-    # Decode encrypted
+    lines.append(f"   ✓ Encrypted MP3: {len(mp3_encrypted.mp3_bytes)} bytes")
+
     decoded_mp3_encrypted = codec_mp3.decode(mp3_encrypted.mp3_bytes, password=password)
-    assert decoded_mp3_encrypted.image_data == image_data
-    print(f"   ✓ Encrypted MP3 round-trip successful")
-    
-    # Test 4: Wrong password detection
-    print("\n4. Testing wrong password detection...")
+    assert _same_bytes(decoded_mp3_encrypted.image_data, image_data)
+    lines.append("   ✓ Encrypted MP3 round-trip successful")
+    return lines
+
+
+def test_4_wrong_password():
+    password = "SecurePassword456"
+    result_encrypted = codec_png.encode(b"MP3 AUDIO DATA" * 200, "audio.mp3", password=password)
+    mp3_encrypted = codec_mp3.encode(
+        b"ID3" + b"\x00" * 1000, b"PNG_IMAGE_DATA" * 150, "image.png", password=password
+    )
+
+    lines = []
     try:
         codec_png.decode(result_encrypted.png_bytes, password="WrongPassword")
-        print("   ✗ FAILED: Should have detected wrong password!")
-        return False
+        assert False, "Should have detected wrong password! (PNG)"
     except codec_png.PngCorruptedError:
-        print(f"   ✓ Wrong password correctly rejected (PNG)")
-    
+        lines.append("   ✓ Wrong password correctly rejected (PNG)")
+
     try:
         codec_mp3.decode(mp3_encrypted.mp3_bytes, password="WrongPassword")
-        print("   ✗ FAILED: Should have detected wrong password!")
-        return False
+        assert False, "Should have detected wrong password! (MP3)"
     except codec_mp3.CorruptedFileError:
-        print(f"   ✓ Wrong password correctly rejected (MP3)")
-    
-    # Test 5: Missing password
-    print("\n5. Testing missing password on encrypted data...")
+        lines.append("   ✓ Wrong password correctly rejected (MP3)")
+    return lines
+
+
+def test_5_missing_password():
+    result_encrypted = codec_png.encode(
+        b"MP3 AUDIO DATA" * 200, "audio.mp3", password="SecurePassword456"
+    )
     try:
         codec_png.decode(result_encrypted.png_bytes)
-        print("   ✗ FAILED: Should have detected missing password!")
-        return False
+        assert False, "Should have detected missing password!"
     except codec_png.PngCorruptedError as e:
         if "password" in str(e).lower():
-            print(f"   ✓ Missing password correctly detected (PNG)")
-        else:
-            print(f"   ✓ Data integrity check detected (PNG)")
-    
+            return ["   ✓ Missing password correctly detected (PNG)"]
+        return ["   ✓ Data integrity check detected (PNG)"]
+
+
+_SUBTESTS = [
+    ("1. Testing encryption.py module...",        test_1_encryption_module),
+    ("2. Testing PNG codec with encryption...",   test_2_png_codec),
+    ("3. Testing MP3 codec with encryption...",   test_3_mp3_codec),
+    ("4. Testing wrong password detection...",    test_4_wrong_password),
+    ("5. Testing missing password detection...",  test_5_missing_password),
+]
+
+
+def _run_one(fn):
+    """Run one subtest in a worker; returns (ok, output or traceback)."""
+    try:
+        return True, fn()
+    except Exception:
+        return False, [traceback.format_exc()]
+
+
+def test_encryption():
+    print("=" * 60)
+    print("SECURITY TEST: AES-256-GCM Encryption")
+    print("=" * 60)
+
+    with multiprocessing.Pool(len(_SUBTESTS)) as pool:
+        results = pool.map(_run_one, [fn for _, fn in _SUBTESTS])
+
+    all_ok = True
+    for (title, _), (ok, lines) in zip(_SUBTESTS, results):
+        print(f"\n{title}")
+        for line in lines:
+            print(line)
+        if not ok:
+            print("   ✗ FAILED")
+            all_ok = False
+
+    if not all_ok:
+        return False
+
     print("\n" + "=" * 60)
     print("✅ ALL SECURITY TESTS PASSED!")
     print("=" * 60)
@@ -120,6 +185,5 @@ if __name__ == "__main__":
         sys.exit(0 if success else 1)
     except Exception as e:
         print(f"\n❌ Test failed with error: {e}", file=sys.stderr)
-        import traceback
         traceback.print_exc()
         sys.exit(1)